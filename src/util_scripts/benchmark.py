@@ -0,0 +1,207 @@
+from asyncio import to_thread
+from pathlib import Path
+from sys import stderr
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Literal, override
+
+from ffmpeg import input as ffmpeg_input
+from pydantic import BaseModel
+
+from util_scripts.utils.capabilities import run_ffmpeg
+from util_scripts.utils.common import Common, Progress, ProgressEvent, ProgressState
+from util_scripts.utils.compress import Compress
+from util_scripts.utils.discord import Discord
+from util_scripts.utils.fonts import load_font_index
+from util_scripts.utils.meme import Meme
+
+if TYPE_CHECKING:
+    from datetime import timedelta
+
+TOOLS: dict[str, type[Common]] = {
+    "compress": Compress,
+    "discord": Discord,
+    "meme": Meme,
+}
+
+
+class Media(BaseModel):
+    suffix: str
+    duration: float
+    size: str | None = "1280x720"
+    rate: int = 30
+    audio: bool = True
+    options: dict[str, Any] = {}
+
+
+class Case(BaseModel):
+    name: str
+    tool: Literal["compress", "discord", "meme"]
+    media: Media
+    inputs: int = 1
+    start_times: list[float] = []
+    settings: dict[str, Any] = {}
+
+
+class CaseResult(BaseModel):
+    wall_time: float
+    frames: int
+    fps: float
+    output_size: int
+    max_size: int | None
+    probes: int
+    progress_events: int
+    progress_time: float
+
+
+class BenchmarkResults(BaseModel):
+    ffmpeg: str
+    cases: dict[str, CaseResult]
+
+
+CASES = [
+    Case(
+        name="compress-720p-30s",
+        tool="compress",
+        media=Media(suffix=".mkv", duration=30, options={"c:v": "libx264", "crf": 18}),
+        settings={"max_size": "4MiB"},
+    ),
+    Case(
+        name="compress-360p-150s-segments",
+        tool="compress",
+        media=Media(suffix=".mkv", duration=150, size="640x360", options={"c:v": "libx264", "crf": 18}),
+        settings={"max_size": "8MiB", "segments": 4},
+    ),
+    Case(
+        name="compress-remux",
+        tool="compress",
+        media=Media(suffix=".mkv", duration=30, size="640x360", options={"c:v": "libx264", "c:a": "aac"}),
+        settings={"max_size": "100MiB"},
+    ),
+    Case(
+        name="discord-10-reactions",
+        tool="discord",
+        media=Media(suffix=".wav", duration=120, size=None),
+        start_times=[10 * index for index in range(10)],
+    ),
+    Case(
+        name="meme-animated-gif",
+        tool="meme",
+        media=Media(suffix=".gif", duration=4, size="480x270", rate=15, audio=False),
+        inputs=4,
+        settings={"text": "benchmark", "video_encoder": "libwebp_anim"},
+    ),
+]
+
+
+class BenchmarkProgress(Progress):
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.frames = 0
+        self.last_frame = 0
+        self.events = 0
+        self.update_time = 0.0
+
+    @override
+    def update(self, event: ProgressEvent, duration_delta: timedelta, time_elapsed_delta: timedelta) -> None:
+        start_time = perf_counter()
+        super().update(event, duration_delta, time_elapsed_delta)
+        self.update_time += perf_counter() - start_time
+        self.events += 1
+        self.last_frame = event.frame or self.last_frame
+
+    @override
+    def finish(self, state: ProgressState) -> None:
+        self.frames += self.last_frame
+        self.last_frame = 0
+
+
+async def generate_media(media: Media, path: Path) -> Path:
+    streams = []
+    if media.size is not None:
+        streams.append(ffmpeg_input(f"testsrc2=size={media.size}:rate={media.rate}:duration={media.duration}", f="lavfi").video)
+    if media.audio:
+        streams.append(ffmpeg_input(f"sine=frequency=440:beep_factor=4:duration={media.duration}", f="lavfi").audio)
+
+    first, *rest = streams
+    stream = first.output(*rest, filename=path, extra_options=media.options)
+    await to_thread(stream.run, quiet=True, overwrite_output=True)
+    return path
+
+
+async def run_case(case: Case, directory: Path) -> CaseResult:
+    input_paths = [await generate_media(case.media, directory / f"{case.name}-{index}{case.media.suffix}") for index in range(case.inputs)]
+    settings: dict[str, Any] = {
+        "input_paths": input_paths,
+        "output_directory": directory / case.name,
+        "hwaccel": "",
+        "video_encoder": "libx264",
+        "force": True,
+        **case.settings,
+    }
+    if case.tool == "discord":
+        settings["reactions"] = [
+            {"input_path": input_path, "start_time": str(start_time), "output_filename_base": f"{input_path.stem}-{index}"}
+            for input_path in input_paths
+            for index, start_time in enumerate(case.start_times)
+        ]
+    if case.tool == "meme":
+        settings.setdefault("font_family", next(iter((await to_thread(load_font_index)).families)))
+    model = TOOLS[case.tool].model_validate(settings)
+
+    progresses: list[BenchmarkProgress] = []
+
+    def create_progress(name: str) -> BenchmarkProgress:
+        progresses.append(progress := BenchmarkProgress(name))
+        return progress
+
+    probe_count = Common.probe_count
+    start_time = perf_counter()
+    output_paths = [output_path async for output_path in model.main(create_progress)]
+    wall_time = perf_counter() - start_time
+
+    frames = sum(progress.frames for progress in progresses)
+    return CaseResult(
+        wall_time=wall_time,
+        frames=frames,
+        fps=frames / wall_time,
+        output_size=sum(output_path.stat().st_size for output_path in output_paths),
+        max_size=getattr(model, "max_size", None),
+        probes=Common.probe_count - probe_count,
+        progress_events=sum(progress.events for progress in progresses),
+        progress_time=sum(progress.update_time for progress in progresses),
+    )
+
+
+def compare(results: BenchmarkResults, baseline: BenchmarkResults, tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for name, result in results.cases.items():
+        if (base := baseline.cases.get(name)) is None:
+            stderr.write(f"[benchmark] {name}: {result.wall_time:.2f}s (no baseline)\n")
+            continue
+
+        change = result.wall_time / base.wall_time - 1
+        stderr.write(f"[benchmark] {name}: {result.wall_time:.2f}s vs {base.wall_time:.2f}s ({change:+.1%})\n")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+async def benchmark(output: Path, baseline: Path | None = None, tolerance: float = 0.1, names: list[str] | None = None) -> int:
+    _, version = await run_ffmpeg("-version")
+    results = BenchmarkResults(ffmpeg=version.partition("\n")[0], cases={})
+
+    with TemporaryDirectory() as directory:
+        for case in CASES:
+            if names is None or case.name in names:
+                stderr.write(f"[benchmark] {case.name}\n")
+                results.cases[case.name] = await run_case(case, Path(directory))
+
+    output.write_text(results.model_dump_json(indent=2), encoding="utf-8")  # noqa: ASYNC240
+    if baseline is None:
+        return 0
+
+    if regressions := compare(results, BenchmarkResults.model_validate_json(baseline.read_text(encoding="utf-8")), tolerance):  # noqa: ASYNC240
+        stderr.write(f"[benchmark] regressions beyond {tolerance:.0%}: {', '.join(regressions)}\n")
+        return 1
+    return 0
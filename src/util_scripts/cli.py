@@ -0,0 +1,104 @@
+from argparse import SUPPRESS, ArgumentParser
+from asyncio import run
+from importlib import import_module
+from json import loads
+from os import environ
+from pathlib import Path
+from sys import stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tomllib import load
+from typing import TYPE_CHECKING, Any, get_origin
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from util_scripts.utils.common import Common
+
+MODELS = {
+    "compress": ("util_scripts.utils.compress", "Compress"),
+    "discord": ("util_scripts.utils.discord", "Discord"),
+    "meme": ("util_scripts.utils.meme", "Meme"),
+}
+
+
+def load_job(path: Path) -> dict[str, Any]:
+    if path.suffix == ".toml":
+        with path.open("rb") as fp:
+            return load(fp)
+    return loads(path.read_text(encoding="utf-8"))
+
+
+def add_model_arguments(parser: ArgumentParser, model: type[Common]) -> None:
+    for name, field in model.model_fields.items():
+        flag = f"--{name.replace('_', '-')}"
+        origin = get_origin(field.annotation)
+        if origin is list:
+            parser.add_argument(flag, dest=name, nargs="+", default=SUPPRESS)
+        elif origin is dict:
+            parser.add_argument(flag, dest=name, type=loads, default=SUPPRESS, metavar="JSON")
+        else:
+            parser.add_argument(flag, dest=name, default=SUPPRESS)
+
+
+def load_model(command: str) -> type[Common]:
+    module, name = MODELS[command]
+    return getattr(import_module(module), name)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    started = perf_counter()
+    parser = ArgumentParser(prog="util-scripts", description="Run a tool headlessly, or open the GUI when no tool is given.")
+    subparsers = parser.add_subparsers(dest="command")
+    command_parsers = {command: subparsers.add_parser(command, add_help=False) for command in MODELS}
+    benchmark_parser = subparsers.add_parser("benchmark", help="Time each tool on generated lavfi media.")
+    benchmark_parser.add_argument("--output", type=Path, default=Path("benchmark.json"), help="JSON file the results are written to.")
+    benchmark_parser.add_argument("--baseline", type=Path, help="Results file to compare against; exits with 1 on regressions.")
+    benchmark_parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed wall time increase over the baseline.")
+    benchmark_parser.add_argument("--cases", nargs="+", help="Only run the named cases.")
+    subparsers.add_parser("history", help="Write the encoding history as CSV to stdout.")
+
+    if (command := parser.parse_known_args(argv)[0].command) is None:
+        from util_scripts.gui.main import main as gui_main  # noqa: PLC0415
+
+        gui_main(started)
+        return
+
+    if command == "history":
+        from util_scripts.utils.history import History  # noqa: PLC0415
+
+        History.export_csv(stdout)
+        return
+
+    if command == "benchmark":
+        arguments = parser.parse_args(argv)
+        with TemporaryDirectory() as directory:
+            environ["XDG_CACHE_HOME"] = environ["XDG_DATA_HOME"] = directory
+            from util_scripts.benchmark import benchmark  # noqa: PLC0415
+
+            raise SystemExit(run(benchmark(arguments.output, arguments.baseline, arguments.tolerance, arguments.cases)))
+
+    from util_scripts.terminal import write_outputs  # noqa: PLC0415
+
+    model = load_model(command)
+    command_parser = command_parsers[command]
+    command_parser.add_argument("-h", "--help", action="help", help="show this help message and exit")
+    command_parser.add_argument("--job", type=Path, help="JSON or TOML file with the tool's settings; options given on the command line take precedence.")
+    command_parser.add_argument("--resume", action="store_true", help="Continue the unfinished jobs of the last interrupted run with its saved settings.")
+    add_model_arguments(command_parser, model)
+
+    arguments = vars(parser.parse_args(argv))
+    del arguments["command"]
+    if arguments.pop("resume"):
+        from util_scripts.utils.job_queue import JobQueue  # noqa: PLC0415
+
+        if (unfinished := JobQueue.latest_unfinished(model.__name__)) is None:
+            msg = f"No unfinished {command} run to resume."
+            raise SystemExit(msg)
+        run_id, settings = unfinished
+        run(write_outputs(model.model_validate_json(settings), run_id))
+        return
+
+    job_path: Path | None = arguments.pop("job", None)
+    settings = (load_job(job_path) if job_path else {}) | arguments
+    run(write_outputs(model.model_validate(settings)))
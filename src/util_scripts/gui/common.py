@@ -0,0 +1,282 @@
+from asyncio import to_thread
+from functools import partial
+from json import loads
+from math import ceil
+from mimetypes import guess_file_type
+from os import fspath
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, Self, override
+
+from nicegui import app, background_tasks, ui
+from nicegui.server import Server
+from pydantic import model_validator
+from webview import FileDialog
+
+from util_scripts.utils.common import Common, Progress, ProgressState
+from util_scripts.utils.history import History
+from util_scripts.utils.job_queue import JobQueue
+from util_scripts.utils.previews import get_preview
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable, Iterable
+
+
+class JobRow(Progress):
+    def __init__(self, name: str, run_switch: ui.switch, code: ui.code) -> None:
+        super().__init__(name)
+
+        self._run_switch = run_switch
+        self._code = code
+
+        with ui.row(wrap=False, align_items="center").classes("w-full"):
+            ui.label(name).classes("text-caption text-grey w-1/6 truncate").props(f"title='{name}'")
+            self._status_badge = ui.badge().props("outline")
+            self._status_badge.set_visibility(False)
+            self._progress = ui.linear_progress()
+            self._out_time_label = ui.label()
+            self._time_elapsed_label = ui.label()
+            self._total_size_label = ui.label()
+            self._speed_label = ui.label()
+            self._cancel_button = ui.button(icon="close", on_click=self.cancel).props("flat dense round")
+
+    @property
+    @override
+    def should_stop(self) -> bool:
+        return super().should_stop or Server.instance.should_exit or not self._run_switch.value
+
+    @override
+    def cancel(self) -> None:
+        super().cancel()
+        self._cancel_button.disable()
+
+    @override
+    def report(self, status: str) -> None:
+        super().report(status)
+        self._status_badge.text = status
+        self._status_badge.set_visibility(True)
+
+    @override
+    def start(self, command_line: str) -> None:
+        self._progress.props(remove="color")
+        self._code.content = command_line
+
+    @override
+    def refresh(self) -> None:
+        self._progress.value = self.value
+        self._out_time_label.text = self.out_time
+        self._time_elapsed_label.text = self.time_elapsed
+        self._total_size_label.text = self.total_size
+        self._speed_label.text = self.speed
+
+    @override
+    def finish(self, state: ProgressState) -> None:
+        self._progress.props(f"color={state}")
+
+
+class PagedGrid[T: Hashable]:
+    page_size: ClassVar = 24
+
+    def __init__(self, render: Callable[[T], object], columns: int = 2) -> None:
+        self._render = render
+        self._items: list[T] = []
+        self._elements: dict[T, ui.element] = {}
+
+        self._pagination = ui.pagination(1, 1, direction_links=True, on_change=self.update)
+        self._pagination.set_visibility(False)
+        self._grid = ui.grid(columns=columns).classes("w-full")
+
+    def set_items(self, items: Iterable[T]) -> None:
+        self._items = list(dict.fromkeys(items))
+        self._pagination.max = max(1, ceil(len(self._items) / self.page_size))
+        self._pagination.set_visibility(self._pagination.max > 1)
+        if (self._pagination.value or 1) > self._pagination.max:
+            self._pagination.value = self._pagination.max
+        self.update()
+
+    def append(self, item: T) -> None:
+        self.set_items([*self._items, item])
+
+    def update(self) -> None:
+        start = ((self._pagination.value or 1) - 1) * self.page_size
+        visible = self._items[start : start + self.page_size]
+
+        for item in self._elements.keys() - set(visible):
+            self._elements.pop(item).delete()
+
+        for index, item in enumerate(visible):
+            if (element := self._elements.get(item)) is None:
+                with self._grid, ui.element() as element:
+                    self._render(item)
+                self._elements[item] = element
+            element.move(self._grid, index)
+
+
+class Tab(Common):
+    flush_interval: ClassVar = 0.5
+    stats_limit: ClassVar = 1000
+
+    @classmethod
+    def media_element(cls, path: Path) -> ui.button | ui.image | None:
+        if not (file_type := guess_file_type(path)[0]):
+            return None
+        if file_type.startswith("audio"):
+            element = ui.button(icon="audio_file", on_click=partial(cls.open_media, path, file_type)).props("flat")
+        else:
+            element = ui.image().classes("cursor-pointer").on("click", partial(cls.open_media, path, file_type))
+            background_tasks.create(cls.load_preview(element, path, file_type), name="load preview")
+        element.props(f"title='{path.as_posix()}'")
+        return element
+
+    @staticmethod
+    async def load_preview(image: ui.image, path: Path, file_type: str) -> None:
+        if (preview_path := await get_preview(path)) is None and file_type.startswith("image"):
+            preview_path = path
+        if preview_path is not None and not image.is_deleted:
+            image.set_source(preview_path)
+
+    @staticmethod
+    def open_media(path: Path, file_type: str) -> None:
+        with ui.dialog().props("maximized") as dialog, ui.card().classes("items-center"):
+            if file_type.startswith("image"):
+                ui.image(path).props("fit=scale-down").force_reload()
+            else:
+                ui.video(path)
+            ui.button(icon="close", on_click=dialog.close).props("flat round")
+        dialog.on("hide", dialog.delete)
+        dialog.open()
+
+    @classmethod
+    def load(cls) -> None:
+        cls.model_validate(app.storage.general.get(cls.__name__, {}))
+
+    @model_validator(mode="after")
+    def mark_dirty(self) -> Self:
+        self._dirty = True
+        return self
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+
+        section = app.storage.general.setdefault(self.__class__.__name__, {})
+        saved: dict[str, Any] = self.model_dump(mode="json")
+        for key, value in saved.items():
+            if self._saved.get(key) != value:
+                section[key] = value
+        self._saved = saved
+
+    @override
+    def model_post_init(self, context: object) -> None:
+        super().model_post_init(context)
+
+        self._dirty = False
+        self._saved = self.model_dump(mode="json")
+        self._run_id: int | None = None
+        ui.timer(self.flush_interval, self.flush)
+        app.on_shutdown(self.flush)
+
+        with ui.row():
+            self._run_switch = ui.switch("Run", on_change=self.run)
+            ui.button("Resume", icon="replay", on_click=self.resume).props("flat").bind_enabled_from(self._run_switch, "value", backward=lambda value: not value)
+            ui.checkbox("Force Rebuild").bind_value(self, "force")
+
+        with ui.grid(columns=2).classes("w-full h-full"):
+            ui.button("Select Inputs", on_click=self.select_inputs)
+            with ui.row(wrap=False, align_items="stretch"):
+                ui.button("Select Output", on_click=self.select_output).classes("w-full")
+                ui.input("Output Suffix").bind_value(self, "output_suffix")
+
+            self._input_label = ui.label().classes("text-caption text-center text-grey").bind_text_from(self, "input_paths", lambda input_paths: ", ".join(map(fspath, input_paths)))
+            self._output_label = ui.label().classes("text-caption text-center text-grey").bind_text_from(self, "output_directory", fspath)
+
+            with ui.expansion("Input"):
+                self._input_grid = PagedGrid(self.media_element)
+            with ui.expansion("Output"):
+                self._results_grid = PagedGrid(self.media_element)
+
+        ui.separator()
+
+        with ui.expansion("Encoding").classes("w-full"):
+            self._code = ui.code().classes("w-full").markdown.style("scrollbar-color: gray black")
+            with ui.row(wrap=False, align_items="center").classes("w-full"):
+                ui.image("妖夢ちゃんに誕生日お祝いしてもらいました.webp").props("width=5%")
+                ui.number("Workers", min=1, precision=0).bind_value(self, "workers")
+                ui.input("Hardware Acceleration").bind_value(self, "hwaccel")
+                ui.input("Video Encoder").bind_value(self, "video_encoder")
+                ui.checkbox("Benchmark Encoders").bind_value(self, "benchmark_encoders")
+            self._jobs_column = ui.column().classes("w-full")
+
+        with ui.expansion("Encoding stats", on_value_change=self.update_stats).classes("w-full"):
+            with ui.row():
+                ui.button("Refresh", icon="refresh", on_click=self.update_stats)
+                ui.button("Export CSV", icon="download", on_click=self.export_stats)
+            self._stats_table = ui.table(
+                columns=[{"name": column, "label": column.replace("_", " ").title(), "field": column, "sortable": True} for column in History.columns],
+                rows=[],
+                row_key="started_at",
+                pagination=20,
+            ).classes("w-full")
+
+        background_tasks.create(self.update_io_elements(), name="update io elements")
+
+    async def run(self) -> None:
+        if self._run_switch.value:
+            try:
+                self._results_grid.set_items([])
+                self._jobs_column.clear()
+                async for output_path in self.main(self.add_job_row, self._run_id):
+                    self._results_grid.append(output_path)
+            finally:
+                self._run_id = None
+                self._run_switch.value = False
+
+    async def resume(self) -> None:
+        if (run := await to_thread(JobQueue.latest_unfinished, self.__class__.__name__)) is None:
+            ui.notify("Nothing to resume")
+            return
+
+        self._run_id, settings = run
+        await self.restore(loads(settings))
+        self._run_switch.value = True
+
+    async def restore(self, settings: dict[str, Any]) -> None:
+        for key, value in settings.items():
+            setattr(self, key, value)
+        await self.update_io_elements()
+
+    async def update_stats(self) -> None:
+        records = await to_thread(History.read, self.stats_limit)
+        self._stats_table.update_rows([record.model_dump(mode="json") for record in records])
+
+    async def export_stats(self) -> None:
+        path = self.output_directory / "encoding-stats.csv"
+
+        def write() -> None:
+            with path.open("w", newline="", encoding="utf-8") as fp:
+                History.export_csv(fp)
+
+        await to_thread(write)
+        ui.notify(f"Exported encoding stats to {path}")
+
+    def add_job_row(self, name: str) -> JobRow:
+        with self._jobs_column:
+            return JobRow(name, self._run_switch, self._code)
+
+    async def update_io_elements(self) -> None:
+        input_paths = self.input_paths
+        self._input_grid.set_items(await to_thread(lambda: [input_path for input_path in input_paths if input_path.exists()]))
+        await to_thread(self.output_directory.mkdir, parents=True, exist_ok=True)
+
+    async def select_inputs(self) -> None:
+        self.input_paths = await self.select_paths(self.input_paths, allow_multiple=True)
+        await self.update_io_elements()
+
+    async def select_output(self) -> None:
+        (self.output_directory,) = await self.select_paths([self.output_directory], FileDialog.FOLDER)
+        await self.update_io_elements()
+
+    async def select_paths[T](self, default: T, dialog_type: int = FileDialog.OPEN, *, allow_multiple: bool = False) -> list[Path] | T:
+        if file := app.native.main_window is not None and await app.native.main_window.create_file_dialog(dialog_type, allow_multiple=allow_multiple):
+            return list(map(Path, file))
+        return default
@@ -0,0 +1,19 @@
+from typing import override
+
+from nicegui import ui
+
+from util_scripts.gui.common import Tab
+from util_scripts.utils import compress
+
+
+class Compress(Tab, compress.Compress):
+    @override
+    def model_post_init(self, context: object) -> None:
+        with ui.row(wrap=False, align_items="center"):
+            ui.number("Max Video Size", suffix="bytes").bind_value(self, "max_size")
+            ui.number("Audio Bitrate", suffix="bit/s").bind_value(self, "audio_bitrate")
+            ui.checkbox("Single Pass").bind_value(self, "single_pass")
+            ui.checkbox("Stream Copy").bind_value(self, "stream_copy")
+            ui.number("Segments", min=1, precision=0).bind_value(self, "segments")
+
+        return super().model_post_init(context)
@@ -0,0 +1,73 @@
+from functools import partial
+from os import fspath
+from typing import TYPE_CHECKING, Any, override
+from uuid import UUID, uuid4
+
+from nicegui import ui
+
+from util_scripts.gui.common import PagedGrid, Tab
+from util_scripts.utils import discord
+from util_scripts.utils.discord import Reaction
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from nicegui.events import ValueChangeEventArguments
+
+
+class Discord(Tab, discord.Discord):
+    @staticmethod
+    def serialize(paths: Iterable[Path]) -> list[str]:
+        return list(map(fspath, paths))
+
+    def on_remove_edit(self, uuid: UUID) -> None:
+        del self.reactions[uuid]
+        self.mark_dirty()  # pyright: ignore[reportCallIssue]
+        self.update_reactions()
+
+    def on_selection(self, arguments: ValueChangeEventArguments) -> None:
+        if arguments.value is not None:
+            self.reactions[uuid4()] = Reaction(input_path=arguments.value)
+            self.mark_dirty()  # pyright: ignore[reportCallIssue]
+            self.update_reactions()
+
+    def update_reactions(self) -> None:
+        self._reactions_grid.set_items(sorted(self.reactions, key=self.reactions.__getitem__))
+
+    def reaction_chip(self, uuid: UUID) -> None:
+        reaction = self.reactions[uuid]
+        with ui.chip(removable=True, on_value_change=partial(self.on_remove_edit, uuid)).classes("h-full").props("outline"), ui.grid(columns=2):
+            ui.label(reaction.input_path.name).classes("col-span-full text-caption text-grey")
+            self.media_element(reaction.input_path)
+            with ui.column():
+                ui.input("Start Time", on_change=self.mark_dirty).classes("w-full").props("clearable").bind_value(reaction, "start_time")  # pyright: ignore[reportArgumentType]
+                ui.input("Output Filename Base", on_change=self.mark_dirty).classes("w-full").bind_value(reaction, "output_filename_base")  # pyright: ignore[reportArgumentType]
+
+    @override
+    def model_post_init(self, context: object) -> None:
+        with ui.row(wrap=False).classes("w-full"):
+            self._input_selector = ui.select(
+                self.serialize(self.input_paths),
+                label="Select Input",
+                on_change=self.on_selection,
+            ).classes("w-full")
+            ui.input("Output Suffix").bind_value(self, "output_suffix")
+
+        with ui.expansion("Edits").classes("w-full"):
+            self._reactions_grid = PagedGrid(self.reaction_chip, columns=3)
+            self.update_reactions()
+
+        super().model_post_init(context)
+
+    @override
+    async def select_inputs(self) -> None:
+        await super().select_inputs()
+        self._input_selector.set_options(self.serialize(self.input_paths))  # pyright: ignore[reportUnknownMemberType]
+
+    @override
+    async def restore(self, settings: dict[str, Any]) -> None:
+        await super().restore(settings)
+        self._input_selector.set_options(self.serialize(self.input_paths))  # pyright: ignore[reportUnknownMemberType]
+        self._reactions_grid.set_items([])
+        self.update_reactions()
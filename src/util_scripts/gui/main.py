@@ -0,0 +1,56 @@
+from importlib import import_module
+from sys import stderr
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from nicegui import app, ui
+from rich.pretty import install
+
+if TYPE_CHECKING:
+    from nicegui.events import ValueChangeEventArguments
+
+    from util_scripts.gui.common import Tab
+
+TABS = {
+    "Compress": "util_scripts.gui.compress",
+    "Discord": "util_scripts.gui.discord",
+    "Meme": "util_scripts.gui.meme",
+}
+
+
+def report_timing(name: str, started: float) -> None:
+    stderr.write(f"[startup] {name}: {perf_counter() - started:.3f}s\n")
+
+
+def root() -> None:
+    panels: dict[str, ui.tab_panel] = {}
+
+    def build(arguments: ValueChangeEventArguments) -> None:
+        if (panel := panels.pop(arguments.value, None)) is not None:
+            started = perf_counter()
+            tab: type[Tab] = getattr(import_module(TABS[arguments.value]), arguments.value)
+            with panel:
+                tab.load()
+            report_timing(f"{arguments.value} tab", started)
+
+    tabs = ui.tabs().classes("w-full")
+    with ui.tab_panels(tabs, on_change=build).classes("w-full") as tab_panels:
+        for name in TABS:
+            with tabs:
+                tab = ui.tab(name)
+            panels[name] = ui.tab_panel(tab)
+    tab_panels.set_value(next(iter(TABS)))
+
+    with ui.row().classes("w-full"):
+        ui.space()
+        ui.button("Quit", on_click=app.shutdown)
+
+
+def main(started: float | None = None) -> None:
+    started = perf_counter() if started is None else started
+    report_timing("imports", started)
+
+    install()
+    app.on_startup(lambda: app.native.main_window is not None and app.native.main_window.maximize())  # pyright: ignore[reportUnknownMemberType]
+    app.on_connect(lambda: report_timing("first paint", started))
+    ui.run(root, dark=None, native=True, reload=False)  # pyright: ignore[reportUnknownMemberType]
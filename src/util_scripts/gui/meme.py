@@ -0,0 +1,63 @@
+from asyncio import to_thread
+from typing import TypeVar, override
+
+from nicegui import background_tasks, element, events, ui
+from pydantic_extra_types.color import Color
+
+from util_scripts.gui.common import Tab
+from util_scripts.utils import meme
+from util_scripts.utils.fonts import load_font_index
+
+AnyElement = TypeVar("AnyElement", bound=element)
+
+
+class Meme(Tab, meme.Meme):
+    @override
+    def model_post_init(self, context: object) -> None:
+        with ui.row(wrap=False, align_items="center"):
+            self._font_select = (
+                ui.select([self.font_family], label="Font Family", with_input=True, on_change=self.on_font_family)
+                .classes("w-64")
+                .style(f"font-family: {self.font_family}")
+                .bind_value(self, "font_family")
+            )
+            self._font_select.add_slot(
+                "option",
+                r"""<q-item v-bind="props.itemProps"><q-item-section :style="{fontFamily: props.opt.label}">{{ props.opt.label }}</q-item-section></q-item>""",
+            )
+            self.color_picker_button("Font Color", "font_color")
+            self.color_picker_button("Box Color", "box_color")
+            ui.checkbox("Loop").bind_value(self, "loop")
+
+        with ui.row(wrap=False, align_items="center").classes("w-full"):
+            ui.label("Font Size").classes("text-caption text-grey")
+            ui.slider(min=1, max=200).props("label-always").bind_value(self, "font_size")
+            ui.separator().props("vertical")
+            ui.label("Box Height").classes("text-caption text-grey")
+            ui.slider(min=1, max=500).props("label-always").bind_value(self, "box_height")
+
+        self._text_area = ui.textarea("Overlay Text").classes("w-full").props("clearable").bind_value(self, "text")
+
+        background_tasks.create(self.load_fonts(), name="load fonts")
+
+        return super().model_post_init(context)
+
+    async def load_fonts(self) -> None:
+        font_index = await to_thread(load_font_index)
+        self._font_select.set_options(sorted({*font_index.families, self.font_family}), value=self.font_family)
+
+    def on_font_family(self, event: events.ValueChangeEventArguments) -> None:
+        event.sender.style(f"font-family: {event.value}")
+
+    def color_picker_button(self, text: str, attr: str) -> None:
+        with ui.button(text, icon="palette") as color_button:
+            ui.color_picker(on_pick=lambda e: self.on_pick_color(color_button, Color(e.color), attr))
+        self.on_pick_color(color_button, getattr(self, attr), attr)
+
+    def on_pick_color(self, button: ui.element, background_color: Color, attr: str) -> None:
+        r, g, b = (255 - int(value) for value in background_color.as_rgb_tuple())
+        text_color = Color((r, g, b))
+
+        button.classes(f"!text-[{text_color.as_hex(format='long')}]")
+        button.classes(f"!bg-[{background_color.as_hex(format='long')}]")
+        setattr(self, attr, background_color)
@@ -0,0 +1,36 @@
+from sys import stderr, stdout
+from typing import TYPE_CHECKING, ClassVar, override
+
+from util_scripts.utils.common import Progress, ProgressState
+
+if TYPE_CHECKING:
+    from util_scripts.utils.common import Common
+
+
+class TerminalProgress(Progress):
+    frame_rate: ClassVar = 1
+
+    def write(self, message: str) -> None:
+        stderr.write(f"[{self.name}] {message}\n")
+
+    @override
+    def report(self, status: str) -> None:
+        super().report(status)
+        self.write(status)
+
+    @override
+    def start(self, command_line: str) -> None:
+        self.write(command_line)
+
+    @override
+    def refresh(self) -> None:
+        self.write(f"{self.value:7.2%}  {self.out_time}  {self.time_elapsed}  {self.total_size}  {self.speed}")
+
+    @override
+    def finish(self, state: ProgressState) -> None:
+        self.write(state)
+
+
+async def write_outputs(model: Common, run_id: int | None = None) -> None:
+    async for output_path in model.main(TerminalProgress, run_id):
+        stdout.write(f"{output_path}\n")
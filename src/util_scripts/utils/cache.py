@@ -0,0 +1,70 @@
+from contextlib import suppress
+from hashlib import sha256
+from os import environ, fspath, utime
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from pydantic import BaseModel, ByteSize
+
+type StrPath = str | Path
+
+CACHE_DIRECTORY = Path(environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "util-scripts"
+
+
+def file_key(path: StrPath) -> tuple[str, int, int]:
+    path = Path(path).resolve()
+    stat = path.stat()
+    return fspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class DiskCache(BaseModel):
+    name: str
+    max_size: ByteSize
+
+    @property
+    def directory(self) -> Path:
+        return CACHE_DIRECTORY / self.name
+
+    def path(self, *key: object, suffix: str = "") -> Path:
+        return self.directory / f"{sha256(repr(key).encode()).hexdigest()}{suffix}"
+
+    def get(self, *key: object, suffix: str = "") -> Path | None:
+        path = self.path(*key, suffix=suffix)
+        try:
+            utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def read_text(self, *key: object) -> str | None:
+        if (path := self.get(*key)) is None:
+            return None
+        with suppress(FileNotFoundError):
+            return path.read_text(encoding="utf-8")
+        return None
+
+    def write_bytes(self, data: bytes, *key: object, suffix: str = "") -> Path:
+        path = self.path(*key, suffix=suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=path.parent, suffix=suffix, delete=False) as fp:
+            fp.write(data)
+        Path(fp.name).replace(path)
+        self.evict()
+        return path
+
+    def write_text(self, text: str, *key: object) -> Path:
+        return self.write_bytes(text.encode(), *key)
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, Path]] = []
+        for path in self.directory.iterdir():
+            with suppress(FileNotFoundError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
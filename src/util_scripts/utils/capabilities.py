@@ -0,0 +1,97 @@
+from asyncio import Lock, create_subprocess_exec
+from asyncio.subprocess import DEVNULL, PIPE
+from pathlib import Path
+from shutil import which
+from time import perf_counter
+from typing import ClassVar, Self
+
+from pydantic import BaseModel
+
+from util_scripts.utils.cache import DiskCache, file_key
+
+ENCODER_CANDIDATES = {
+    ".mp4": ["h264_nvenc", "h264_qsv", "h264_amf", "h264_videotoolbox", "h264_vaapi", "libx264", "hevc_nvenc", "hevc_qsv", "libx265"],
+    ".mkv": ["h264_nvenc", "h264_qsv", "h264_amf", "h264_videotoolbox", "h264_vaapi", "libx264", "hevc_nvenc", "hevc_qsv", "libx265"],
+    ".webm": ["vp9_qsv", "vp9_vaapi", "libvpx-vp9", "av1_nvenc", "av1_qsv", "libsvtav1"],
+    ".webp": ["libwebp_anim", "libwebp"],
+    ".gif": ["gif"],
+}
+
+
+async def run_ffmpeg(*args: str) -> tuple[int, str]:
+    process = await create_subprocess_exec(ffmpeg_path(), "-hide_banner", *args, stdin=DEVNULL, stdout=PIPE, stderr=DEVNULL)
+    stdout, _ = await process.communicate()
+    return process.returncode or 0, stdout.decode()
+
+
+def ffmpeg_path() -> Path:
+    if path := which("ffmpeg"):
+        return Path(path)
+
+    msg = "ffmpeg was not found on PATH."
+    raise FileNotFoundError(msg)
+
+
+class Capabilities(BaseModel):
+    cache: ClassVar = DiskCache(name="capabilities", max_size="1MiB")  # pyright: ignore[reportArgumentType]
+    lock: ClassVar = Lock()
+    hwaccel_preference: ClassVar = ["cuda", "d3d12va", "d3d11va", "videotoolbox", "qsv", "vaapi", "dxva2", "vulkan"]
+    benchmark_source: ClassVar = "testsrc2=size=1280x720:rate=30"
+    benchmark_frames: ClassVar = 120
+
+    hwaccels: list[str] = []
+    working_hwaccels: list[str] = []
+    encoders: list[str] = []
+    working_encoders: dict[str, bool] = {}
+    encoder_fps: dict[str, float] = {}
+
+    @classmethod
+    async def load(cls) -> Self:
+        async with cls.lock:
+            key = file_key(ffmpeg_path())
+            if (cached := cls.cache.read_text(*key)) is not None:
+                return cls.model_validate_json(cached)
+
+            _, hwaccels = await run_ffmpeg("-hwaccels")
+            _, encoders = await run_ffmpeg("-encoders")
+            capabilities = cls(
+                hwaccels=[line.strip() for line in hwaccels.splitlines()[1:] if line.strip()],
+                encoders=[line.split()[1] for line in encoders.partition(" ------\n")[2].splitlines() if line.strip()],
+            )
+            capabilities.working_hwaccels = [hwaccel for hwaccel in capabilities.hwaccels if await capabilities.check_hwaccel(hwaccel)]
+            capabilities.save()
+            return capabilities
+
+    @staticmethod
+    async def check_hwaccel(hwaccel: str) -> bool:
+        returncode, _ = await run_ffmpeg("-v", "error", "-init_hw_device", hwaccel, "-f", "lavfi", "-i", "nullsrc", "-frames:v", "1", "-f", "null", "-")
+        return returncode == 0
+
+    async def check_encoder(self, encoder: str, frames: int) -> float | None:
+        start_time = perf_counter()
+        returncode, _ = await run_ffmpeg("-v", "error", "-f", "lavfi", "-i", self.benchmark_source, "-frames:v", str(frames), "-c:v", encoder, "-f", "null", "-")
+        return frames / (perf_counter() - start_time) if returncode == 0 else None
+
+    def save(self) -> None:
+        self.cache.write_text(self.model_dump_json(), *file_key(ffmpeg_path()))
+
+    def select_hwaccel(self) -> str | None:
+        return next((hwaccel for hwaccel in self.hwaccel_preference if hwaccel in self.working_hwaccels), None)
+
+    async def select_encoder(self, suffix: str, *, benchmark: bool) -> str | None:
+        candidates = [encoder for encoder in ENCODER_CANDIDATES.get(suffix, []) if encoder in self.encoders]
+
+        async with self.lock:
+            for encoder in candidates:
+                if encoder in (self.encoder_fps if benchmark else self.working_encoders):
+                    continue
+                fps = await self.check_encoder(encoder, self.benchmark_frames if benchmark else 1)
+                self.working_encoders[encoder] = fps is not None
+                if benchmark:
+                    self.encoder_fps[encoder] = fps or 0
+                self.save()
+
+        working = [encoder for encoder in candidates if self.working_encoders[encoder]]
+        if benchmark:
+            working.sort(key=self.encoder_fps.__getitem__, reverse=True)
+        return next(iter(working), None)
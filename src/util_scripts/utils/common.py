@@ -1,29 +1,41 @@
 from abc import abstractmethod
-from asyncio import CancelledError
-from datetime import timedelta
+from asyncio import CancelledError, Lock, Queue, QueueShutDown, Semaphore, TaskGroup, create_task, gather, shield, to_thread, wait_for
+from contextlib import asynccontextmanager, suppress
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from hashlib import sha256
+from itertools import pairwise
+from json import dumps, loads
 from logging import getLogger
 from math import inf
-from mimetypes import guess_file_type
-from os import fspath
+from os import fspath, process_cpu_count
 from pathlib import Path
+from tempfile import NamedTemporaryFile
 from time import perf_counter
-from typing import TYPE_CHECKING, ClassVar, Literal, Self, override
+from typing import TYPE_CHECKING, ClassVar, Literal, NamedTuple, override
 
-from ffmpeg import probe_obj
-from nicegui import app, ui
-from nicegui.run import io_bound
-from nicegui.server import Server
-from pydantic import BaseModel, ByteSize, ConfigDict, model_validator
-from webview import FileDialog
+from ffmpeg import probe, probe_obj
+from ffmpeg.ffprobe.schema import ffprobeType
+from pydantic import BaseModel, ByteSize, ConfigDict, Field, PositiveInt, TypeAdapter, field_validator
+
+from util_scripts.utils.cache import DiskCache, StrPath, file_key
+from util_scripts.utils.capabilities import Capabilities
+from util_scripts.utils.history import EncodeRecord, History, Usage, read_usage
+from util_scripts.utils.job_queue import JobQueue, JobState
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
-    from subprocess import Popen
+    from asyncio.subprocess import Process
+    from collections.abc import AsyncGenerator, AsyncIterable, Awaitable, Callable, Coroutine, Iterable
 
     from ffmpeg.dag.global_runnable.global_args import GlobalArgs
-    from ffmpeg.ffprobe.schema import ffprobeType
+    from ffmpeg.dag.nodes import GlobalStream
+    from ffmpeg.ffprobe.schema import streamType
+
+type ProgressState = Literal["positive", "negative", "warning"]
+
 
-type StrPath = str | Path
+def default_workers() -> int:
+    return max(1, (process_cpu_count() or 1) // 2)
 
 
 class FullyValidatedModel(BaseModel):
@@ -32,194 +44,455 @@ class FullyValidatedModel(BaseModel):
         validate_default=True,
         validate_return=True,
         validate_by_name=True,
-        ignored_types=(ui.refreshable_method,),
     )
 
 
+class ProgressEvent(BaseModel):
+    frame: int | None = None
+    fps: float | None = None
+    total_size: int | None = None
+    out_time_us: int | None = None
+    speed: float | None = None
+    progress: Literal["continue", "end"]
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def parse_unavailable(cls, value: object) -> object:
+        return None if value == "N/A" else value
+
+    @field_validator("speed", mode="before")
+    @classmethod
+    def parse_speed(cls, value: object) -> object:
+        return value.removesuffix("x") if isinstance(value, str) else value
+
+
+class Progress:
+    frame_rate: ClassVar = 4
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.cancelled = False
+
+        self.status = ""
+        self.value = 0.0
+        self.out_time = ""
+        self.time_elapsed = ""
+        self.total_size = ""
+        self.speed = ""
+
+        self._last_refresh = -inf
+
+    @property
+    def should_stop(self) -> bool:
+        return self.cancelled
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def report(self, status: str) -> None:
+        self.status = status
+
+    def start(self, command_line: str) -> None:
+        pass
+
+    def refresh(self) -> None:
+        pass
+
+    def finish(self, state: ProgressState) -> None:
+        pass
+
+    def update(self, event: ProgressEvent, duration_delta: timedelta, time_elapsed_delta: timedelta) -> None:
+        ratio_format = "{} / {}"
+        if event.out_time_us is not None:
+            out_time_delta = timedelta(microseconds=event.out_time_us)
+
+            self.value = out_time_delta / duration_delta
+            self.out_time = ratio_format.format(
+                out_time_delta,
+                duration_delta,
+            )
+            self.time_elapsed = ratio_format.format(
+                time_elapsed_delta,
+                time_elapsed_delta / (self.value or inf),
+            )
+        if event.total_size is not None:
+            self.total_size = ratio_format.format(
+                ByteSize(event.total_size).human_readable(),
+                ByteSize(event.total_size / (self.value or inf)).human_readable(),
+            )
+        if event.speed is not None:
+            self.speed = f"{event.speed}x"
+
+        now = perf_counter()
+        if event.progress == "end" or now - self._last_refresh >= 1 / self.frame_rate:
+            self._last_refresh = now
+            self.refresh()
+
+    async def handle_std(self, process: Process, duration_delta: timedelta) -> ProgressEvent | None:
+        event = None
+        if process.stdout is None:
+            return event
+
+        start_time = perf_counter()
+        block: dict[str, str] = {}
+        async for line in process.stdout:
+            if self.should_stop:
+                process.terminate()
+                return event
+
+            key, _, value = line.decode().strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                event = ProgressEvent.model_validate(block)
+                self.update(event, duration_delta, timedelta(seconds=perf_counter() - start_time))
+                block.clear()
+        return event
+
+
+class PartProgress(Progress):
+    def __init__(self, parent: Progress, parts: list[PartProgress] | None = None, duration: float = 0) -> None:
+        super().__init__(parent.name)
+        self.parent = parent
+        self.parts = parts
+        self.duration_delta = timedelta(seconds=duration)
+        self.event: ProgressEvent | None = None
+
+        if parts is not None:
+            parts.append(self)
+
+    @property
+    @override
+    def should_stop(self) -> bool:
+        return super().should_stop or self.parent.should_stop
+
+    @override
+    def report(self, status: str) -> None:
+        self.parent.report(status)
+
+    @override
+    def start(self, command_line: str) -> None:
+        self.parent.start(command_line)
+
+    @override
+    def finish(self, state: ProgressState) -> None:
+        if state != "positive":
+            self.parent.finish(state)
+
+    @override
+    def update(self, event: ProgressEvent, duration_delta: timedelta, time_elapsed_delta: timedelta) -> None:
+        self.event = event
+        if self.parts is None:
+            return
+
+        events = [part.event for part in self.parts if part.event is not None]
+        self.parent.update(
+            ProgressEvent(
+                frame=sum(part_event.frame or 0 for part_event in events),
+                fps=sum(part_event.fps or 0 for part_event in events),
+                total_size=sum(part_event.total_size or 0 for part_event in events),
+                out_time_us=sum(part_event.out_time_us or 0 for part_event in events),
+                speed=sum(part_event.speed or 0 for part_event in events),
+                progress="continue",
+            ),
+            sum((part.duration_delta for part in self.parts), timedelta()),
+            time_elapsed_delta,
+        )
+
+
+class Job(NamedTuple):
+    name: str
+    run: Callable[[Progress], AsyncIterable[Path]]
+    outputs: dict[Path, str | None]
+
+
 class Common(FullyValidatedModel):
-    hwaccel: ClassVar = "d3d12va"
+    probe_cache: ClassVar = DiskCache(name="probe", max_size="16MiB")  # pyright: ignore[reportArgumentType]
+    probe_adapter: ClassVar = TypeAdapter(ffprobeType)
+    probe_count: ClassVar = 0
+    usage_min_interval: ClassVar = 0.005
+    usage_interval_ratio: ClassVar = 0.05
+    usage_interval: ClassVar = 0.25
+    manifest_name: ClassVar = ".util-scripts-manifest.json"
+    logged_levels: ClassVar = ("[warning]", "[error]", "[fatal]", "[panic]")
+    record_states: ClassVar = {"positive": "done", "negative": "failed", "warning": "cancelled"}
+    unfingerprinted_fields: ClassVar = {"input_paths", "output_directory", "workers", "benchmark_encoders", "force"}
 
     input_paths: list[Path] = []
     output_directory: Path = Path()
 
     output_suffix: str = ""
+    workers: PositiveInt = Field(default_factory=default_workers)
+    hwaccel: str = "auto"
+    video_encoder: str = "auto"
+    benchmark_encoders: bool = False
+    force: bool = False
 
-    @staticmethod
-    def media_element(path: Path) -> ui.audio | ui.image | ui.video | None:
-        if file_type := guess_file_type(path)[0]:
-            if file_type.startswith("image"):
-                element = ui.image(path)
-                element.force_reload()
-            else:
-                element = ui.video(path)
-            element.props(f"title='{path.as_posix()}'")
-            return element
-        return None
-
-    @staticmethod
-    def get_ffprobe_info(path: StrPath, entries_type: Literal["stream", "format"], *entries: str, stream: str) -> ffprobeType:
-        if info := probe_obj(
-            path,
-            show_streams=False,
-            show_format=False,
-            select_streams=stream,
-            show_entries=f"{entries_type}={','.join(entries)}",
-        ):
+    @classmethod
+    async def probe(cls, path: StrPath) -> ffprobeType:
+        key = file_key(path)
+        if (cached := cls.probe_cache.read_text(*key)) is not None:
+            return cls.probe_adapter.validate_json(cached)
+
+        Common.probe_count += 1
+        if info := await to_thread(probe_obj, path):
+            cls.probe_cache.write_text(cls.probe_adapter.dump_json(info).decode(), *key)
             return info
 
         msg = "The value from ffprobe is None."
         raise ValueError(msg)
 
     @classmethod
-    def get_duration(cls, path: StrPath) -> float:
-        info = cls.get_ffprobe_info(path, "format", "duration", stream="")
+    async def get_duration(cls, path: StrPath) -> float:
+        info = await cls.probe(path)
         if info.format is None or info.format.duration is None:
             msg = f"The value of 'format' or 'duration' is None: {info}"
             raise ValueError(msg)
         return info.format.duration
 
     @classmethod
-    def load(cls, tabs: ui.tabs) -> None:
-        with tabs:
-            tab = ui.tab(cls.__name__)
-        with ui.tab_panel(tab):
-            cls.model_validate(app.storage.general[cls.__name__])
-        tabs.set_value(tabs.value or tab)
-
-    @model_validator(mode="after")
-    def write(self) -> Self:
-        app.storage.general[self.__class__.__name__] = self.model_dump(mode="json")
-        return self
+    async def get_streams(cls, path: StrPath, codec_type: Literal["video", "audio"]) -> list[streamType]:
+        info = await cls.probe(path)
+        if info.streams is None or info.streams.stream is None:
+            return []
+        return [stream for stream in info.streams.stream if stream.codec_type == codec_type]
 
-    @override
-    def model_post_init(self, context: object) -> None:
-        super().model_post_init(context)
-
-        with ui.row():
-            self._run_switch = ui.switch("Run", on_change=self.run)
-
-        with ui.grid(columns=2).classes("w-full h-full"):
-            ui.button("Select Inputs", on_click=self.select_inputs)
-            with ui.row(wrap=False, align_items="stretch"):
-                ui.button("Select Output", on_click=self.select_output).classes("w-full")
-                ui.input("Output Suffix").bind_value(self, "output_suffix")
-
-            self._input_label = ui.label().classes("text-caption text-center text-grey").bind_text_from(self, "input_paths", lambda input_paths: ", ".join(map(fspath, input_paths)))
-            self._output_label = ui.label().classes("text-caption text-center text-grey").bind_text_from(self, "output_directory", fspath)
-
-            with ui.expansion("Input"):
-                self._input_grid = ui.grid(columns=2).classes("w-full")
-            with ui.expansion("Output"):
-                self._results_grid = ui.grid(columns=2).classes("w-full")
-
-        ui.separator()
-
-        with ui.expansion("Encoding").classes("w-full"):
-            self._code = ui.code().classes("w-full").markdown.style("scrollbar-color: gray black")
-            with ui.row(wrap=False, align_items="center").classes("w-full"):
-                ui.image("妖夢ちゃんに誕生日お祝いしてもらいました.webp").props("width=5%")
-                self._progress = ui.linear_progress()
-                self._out_time_label = ui.label()
-                self._time_elapsed_label = ui.label()
-                self._total_size_label = ui.label()
-                self._speed_label = ui.label()
-
-        self.update_io_elements()
-
-    async def run(self) -> None:
-        if self._run_switch.value:
-            try:
-                self._results_grid.clear()
-                with self._results_grid:
-                    for output_path in await io_bound(lambda: list(self.main())):
-                        self.media_element(output_path)
-            finally:
-                self._run_switch.value = False
+    @classmethod
+    async def get_width(cls, path: StrPath) -> int:
+        streams = await cls.get_streams(path, "video")
+        if not streams or streams[0].width is None:
+            msg = f"The value of 'stream' or 'width' is None: {streams}"
+            raise ValueError(msg)
+        return streams[0].width
 
-    @abstractmethod
-    def main(self) -> Generator[Path]: ...
+    async def get_hwaccel(self) -> str | None:
+        if self.hwaccel == "auto":
+            return (await Capabilities.load()).select_hwaccel()
+        return self.hwaccel or None
 
-    def update_io_elements(self) -> None:
-        self._input_grid.clear()
-        with self._input_grid:
-            for input_path in self.input_paths:
-                if input_path.exists():
-                    self.media_element(input_path)
+    async def get_video_encoder(self) -> str | None:
+        if self.video_encoder == "auto":
+            return await (await Capabilities.load()).select_encoder(self.output_suffix, benchmark=self.benchmark_encoders)
+        return self.video_encoder or None
 
-        self.output_directory.mkdir(parents=True, exist_ok=True)
+    @staticmethod
+    async def get_keyframe_times(path: StrPath, times: Iterable[float]) -> list[float]:
+        info = await to_thread(
+            probe,
+            path,
+            show_streams=False,
+            show_format=False,
+            show_packets=True,
+            select_streams="v:0",
+            read_intervals=",".join(f"{time}%+#1" for time in times),
+            show_entries="packet=pts_time,flags",
+        )
+        return sorted({float(packet["pts_time"]) for packet in info.get("packets", []) if "K" in packet.get("flags", "")})
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_directory / self.manifest_name
+
+    def read_manifest(self) -> dict[str, str]:
+        try:
+            return loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError, ValueError:
+            return {}
+
+    def write_manifest(self, text: str) -> None:
+        with NamedTemporaryFile("w", dir=self.output_directory, prefix=".", suffix=".json", delete=False, encoding="utf-8") as fp:
+            fp.write(text)
+        Path(fp.name).replace(self.manifest_path)
+
+    async def save_manifest(self, manifest: dict[str, str]) -> None:
+        async with self._manifest_lock:
+            if (text := dumps(manifest, indent=2, sort_keys=True)) != self._manifest_text:
+                await to_thread(self.write_manifest, text)
+                self._manifest_text = text
+
+    def fingerprint(self, input_path: Path, *parts: object) -> str | None:
+        if not input_path.exists():
+            return None
+        settings = self.model_dump(mode="json", exclude=self.unfingerprinted_fields)
+        return sha256(repr((file_key(input_path), settings, parts)).encode()).hexdigest()
+
+    def is_current(self, manifest: dict[str, str], output_path: Path, fingerprint: str | None) -> bool:
+        return not self.force and fingerprint is not None and manifest.get(fspath(output_path)) == fingerprint and output_path.exists()
 
-    async def select_inputs(self) -> None:
-        self.input_paths = await self.select_paths(self.input_paths, allow_multiple=True)
-        self.update_io_elements()
+    @abstractmethod
+    def jobs(self) -> Iterable[Job]: ...
 
-    async def select_output(self) -> None:
-        (self.output_directory,) = await self.select_paths([self.output_directory], FileDialog.FOLDER)
-        self.update_io_elements()
+    async def main(self, create_progress: Callable[[str], Progress] = Progress, run_id: int | None = None) -> AsyncGenerator[Path]:
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        self._semaphore = semaphore = Semaphore(self.workers)
+        output_paths: Queue[Path] = Queue()
+        manifest = self.read_manifest()
+        self._manifest_lock = Lock()
+        self._manifest_text = dumps(manifest, indent=2, sort_keys=True)
+
+        jobs = await to_thread(list, self.jobs())
+        if run_id is None:
+            run_id = await to_thread(JobQueue.create_run, self.__class__.__name__, self.model_dump_json(), (job.name for job in jobs))
+            positions = set(range(len(jobs)))
+        else:
+            positions = await to_thread(JobQueue.pending, run_id)
+
+        tasks = []
+        for position, job in enumerate(jobs):
+            if position in positions:
+                progress = create_progress(job.name)
+                run = self.run_job(job, progress, semaphore, output_paths, manifest)
+                tasks.append(create_task(self.track_job(run, progress, partial(JobQueue.set_state, run_id, position))))
+
+        results = gather(*tasks, return_exceptions=True)
+        results.add_done_callback(lambda _: output_paths.shutdown())
+        try:
+            while True:
+                try:
+                    output_path = await output_paths.get()
+                except QueueShutDown:
+                    break
+                yield output_path
+        finally:
+            for task in tasks:
+                task.cancel()
+            await results
+
+        if errors := [result for result in results.result() if isinstance(result, Exception)]:
+            msg = f"{len(errors)} of {len(tasks)} jobs failed"
+            raise ExceptionGroup(msg, errors)
+
+    async def track_job(self, run: Awaitable[None], progress: Progress, set_state: Callable[[JobState], None]) -> None:
+        try:
+            await run
+        except Exception:
+            await to_thread(set_state, JobState.FAILED)
+            raise
+        if not progress.should_stop:
+            await to_thread(set_state, JobState.DONE)
+
+    async def run_job(self, job: Job, progress: Progress, semaphore: Semaphore, output_paths: Queue[Path], manifest: dict[str, str]) -> None:
+        if job.outputs and all(self.is_current(manifest, output_path, fingerprint) for output_path, fingerprint in job.outputs.items()):
+            progress.report("up to date")
+            progress.finish("positive")
+            for output_path in job.outputs:
+                output_paths.put_nowait(output_path)
+            return
 
-    async def select_paths[T](self, default: T, dialog_type: int = FileDialog.OPEN, *, allow_multiple: bool = False) -> list[Path] | T:
-        if file := app.native.main_window is not None and await app.native.main_window.create_file_dialog(dialog_type, allow_multiple=allow_multiple):
-            return list(map(Path, file))
-        return default
+        async with semaphore:
+            try:
+                if progress.should_stop:
+                    raise CancelledError  # noqa: TRY301
+                for output_path, fingerprint in job.outputs.items():
+                    if not self.is_current(manifest, output_path, fingerprint):
+                        manifest.pop(fspath(output_path), None)
+                async for output_path in job.run(progress):
+                    output_paths.put_nowait(output_path)
+                    if (fingerprint := job.outputs.get(output_path)) is not None:
+                        manifest[fspath(output_path)] = fingerprint
+                        await self.save_manifest(manifest)
+            except CancelledError:
+                if not progress.cancelled:
+                    raise
 
     def get_output_path(self, input_path: Path) -> Path:
         return self.output_directory / input_path.with_suffix(self.output_suffix).name
 
-    def encode_with_progress(self, stream: GlobalArgs, duration: float) -> None:
+    @asynccontextmanager
+    async def lend_worker(self) -> AsyncGenerator[Semaphore]:
+        self._semaphore.release()
+        try:
+            yield self._semaphore
+        finally:
+            await shield(self._semaphore.acquire())
+
+    async def encode_all(self, encodes: Iterable[Coroutine[object, object, object]], progress: Progress) -> None:
+        async with self.lend_worker() as semaphore, TaskGroup() as group:
+            for encode in encodes:
+                group.create_task(self.encode_limited(encode, semaphore))
+        if progress.should_stop:
+            raise CancelledError
+
+    @staticmethod
+    async def encode_limited(encode: Coroutine[object, object, object], semaphore: Semaphore) -> None:
+        try:
+            async with semaphore:
+                await encode
+        finally:
+            encode.close()
+
+    async def encode_with_progress(self, stream: GlobalArgs, duration: float, progress: Progress, loglevel: str = "warning") -> str:
         stream = stream.global_args(
-            loglevel="warning",
+            loglevel=f"level+{loglevel}",
             y=True,
             progress="-",
         )
 
         duration_delta = timedelta(seconds=duration)
 
-        self._progress.props(remove="color")
-        self._code.content = stream.compile_line()
+        command_line = stream.compile_line()
+        progress.start(command_line)
+
+        started_at = datetime.now(UTC)
+        start_time = perf_counter()
+        process = await stream.run_async_awaitable(quiet=True)
+        try:
+            errors, event, usage = await gather(self.read_stderr(process), progress.handle_std(process, duration_delta), self.monitor_usage(process))
+        finally:
+            if process.returncode is None:
+                process.terminate()
+            await process.wait()
+        wall_time = perf_counter() - start_time
+
+        state: ProgressState = "warning" if progress.should_stop else "negative" if process.returncode else "positive"
+        record = EncodeRecord(
+            started_at=started_at,
+            tool=self.__class__.__name__,
+            job=progress.name,
+            state=self.record_states[state],
+            wall_time=wall_time,
+            cpu_time=usage.cpu_time if usage else None,
+            peak_rss=usage.peak_rss if usage else None,
+            fps=event.frame / wall_time if event and event.frame is not None else None,
+            speed=event.out_time_us / 1_000_000 / wall_time if event and event.out_time_us is not None else None,
+            input_bytes=self.get_input_bytes(stream.compile()),
+            output_bytes=self.get_output_bytes(stream),
+            command_line=command_line,
+        )
+        await to_thread(History.add, record)
+        progress.finish(state)
 
-        with stream.run_async(quiet=True) as process:
-            self.handle_std(process, duration_delta)
-            errors = "" if process.stderr is None else process.stderr.read().decode()
+        if state == "warning":
+            raise CancelledError
 
-        if process.poll():
-            self._progress.props("color=negative")
+        if state == "negative":
             raise RuntimeError(errors)
 
-        self._progress.props("color=positive")
+        if warnings := [line for line in errors.splitlines() if any(level in line for level in self.logged_levels)]:
+            getLogger().warning("\n".join(warnings))
+        return errors
 
-        getLogger().warning(errors)
+    @staticmethod
+    def get_input_bytes(arguments: list[str]) -> int:
+        return sum(Path(argument).stat().st_size for option, argument in pairwise(arguments) if option == "-i" and Path(argument).is_file())
 
-    def handle_std(self, process: Popen[bytes], duration_delta: timedelta) -> None:
-        if process.stdout is None:
-            return
+    @staticmethod
+    def get_output_bytes(stream: GlobalStream) -> int | None:
+        output_paths = [path for output in stream.node.inputs if (path := Path(output.node.filename)).is_file()]
+        return sum(path.stat().st_size for path in output_paths) if output_paths else None
 
-        ratio_format = "{} / {}"
+    @classmethod
+    async def monitor_usage(cls, process: Process) -> Usage | None:
+        usage = None
+        samples = 0
         start_time = perf_counter()
-        for line in process.stdout:
-            if Server.instance.should_exit or not self._run_switch.value:
-                process.terminate()
-                self._progress.props("color=warning")
-                raise CancelledError
-
-            match line.split(b"="):
-                case [b"total_size", total_size]:
-                    self._total_size_label.text = ratio_format.format(
-                        ByteSize(total_size).human_readable(),
-                        ByteSize(int(total_size) / (self._progress.value or inf)).human_readable(),
-                    )
-                case [b"out_time_us", out_time_us] if out_time_us != b"N/A\n":
-                    out_time_delta = timedelta(microseconds=int(out_time_us))
-                    time_elapsed_delta = timedelta(seconds=perf_counter() - start_time)
-
-                    self._progress.value = out_time_delta / duration_delta
-                    self._out_time_label.text = ratio_format.format(
-                        out_time_delta,
-                        duration_delta,
-                    )
-                    self._time_elapsed_label.text = ratio_format.format(
-                        time_elapsed_delta,
-                        time_elapsed_delta / self._progress.value,
-                    )
-                case [b"speed", speed]:
-                    self._speed_label.text = speed.decode()
-                case _:
-                    pass
+        while True:
+            if sample := read_usage(process.pid):
+                usage = sample
+                samples += 1
+            with suppress(TimeoutError):
+                await wait_for(process.wait(), min(max(cls.usage_interval_ratio * (perf_counter() - start_time), cls.usage_min_interval), cls.usage_interval))
+                return usage if samples > 1 else None
+
+    @staticmethod
+    async def read_stderr(process: Process) -> str:
+        return "" if process.stderr is None else (await process.stderr.read()).decode()
@@ -1,52 +1,220 @@
+from enum import StrEnum
+from functools import partial
+from itertools import pairwise
 from pathlib import Path
-from tempfile import TemporaryFile
-from typing import TYPE_CHECKING, override
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, ClassVar, override
 
 from ffmpeg import input as ffmpeg_input
-from nicegui import ui
-from pydantic import ByteSize  # noqa: TC002
+from pydantic import ByteSize, PositiveInt  # noqa: TC002
 
-from util_scripts.utils.common import Common
+from util_scripts.utils.common import Common, Job, PartProgress, Progress
+from util_scripts.utils.job_queue import atomic_output
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import AsyncGenerator, Generator
+
+    from ffmpeg.ffprobe.schema import streamType
+
+
+class Plan(StrEnum):
+    REMUX = "remux"
+    COPY_AUDIO = "copy audio"
+    ENCODE = "re-encode"
 
 
 class Compress(Common):
+    max_attempts: ClassVar = 3
+    min_segment_duration: ClassVar = 60
+    copy_suffixes: ClassVar = frozenset({".mp4", ".m4v", ".mov"})
+    copy_video_codecs: ClassVar = frozenset({"h264", "hevc", "av1", "vp9", "mpeg4"})
+    copy_audio_codecs: ClassVar = frozenset({"aac", "opus", "mp3", "ac3", "eac3", "alac", "flac"})
+
     max_size: ByteSize = "500MiB"  # pyright: ignore[reportAssignmentType]
+    audio_bitrate: PositiveInt = 128_000
+    single_pass: bool = True
+    stream_copy: bool = True
+    segments: PositiveInt = 1
     output_suffix: str = ".mp4"
 
+    @staticmethod
+    def rate_options(video_max_rate: float) -> dict[str, float]:
+        if video_max_rate <= 0:
+            msg = f"The maximum size leaves no room for video: {video_max_rate} bit/s"
+            raise ValueError(msg)
+        return {
+            "bufsize": 2 * video_max_rate,
+            "maxrate": video_max_rate,
+        }
+
     @override
-    def model_post_init(self, context: object) -> None:
-        ui.number("Max Video Size", suffix="bytes").bind_value(self, "max_size")
+    def jobs(self) -> Generator[Job]:
+        for input_path in self.input_paths:
+            yield Job(input_path.name, partial(self.compress, input_path), {self.get_output_path(input_path): self.fingerprint(input_path)})
 
-        return super().model_post_init(context)
+    async def plan(self, input_path: Path) -> Plan:
+        if not (video_streams := await self.get_streams(input_path, "video")):
+            msg = f"{input_path} has no video stream to compress."
+            raise ValueError(msg)
+        if not self.stream_copy or self.output_suffix not in self.copy_suffixes:
+            return Plan.ENCODE
 
-    @override
-    def main(self) -> Generator[Path]:
-        with TemporaryFile(suffix=self.output_suffix, delete_on_close=False) as audio_fp:
-            audio_path = Path(audio_fp.name)
-            audio_input = ffmpeg_input(audio_path)
-
-            for input_path in self.input_paths:
-                duration = self.get_duration(input_path)
-
-                input_stream = ffmpeg_input(input_path, hwaccel=self.hwaccel)
-                stream = input_stream.audio.output(filename=audio_path)
-                self.encode_with_progress(stream, duration)
-
-                output_path = self.get_output_path(input_path)
-                video_max_rate = 8 * (self.max_size - audio_path.stat().st_size) / duration
-                stream = input_stream.video_stream(0).output(
-                    audio_input,
+        audio_streams = await self.get_streams(input_path, "audio")
+        audio_copyable = all(stream.codec_name in self.copy_audio_codecs for stream in audio_streams)
+
+        if audio_copyable and all(stream.codec_name in self.copy_video_codecs for stream in video_streams) and input_path.stat().st_size <= self.max_size:  # noqa: ASYNC240
+            return Plan.REMUX
+        if audio_streams and audio_copyable and await self.get_audio_bitrate(input_path) is not None:
+            return Plan.COPY_AUDIO
+        return Plan.ENCODE
+
+    @staticmethod
+    def get_tag_bitrate(stream: streamType) -> int | None:
+        tags = stream.tags.tag if stream.tags is not None and stream.tags.tag is not None else ()
+        return next((int(tag.value) for tag in tags if tag.key is not None and tag.key.partition("-")[0] == "BPS" and tag.value is not None and tag.value.isdigit()), None)
+
+    async def get_audio_bitrate(self, input_path: Path) -> int | None:
+        bitrates = [stream.bit_rate or self.get_tag_bitrate(stream) for stream in await self.get_streams(input_path, "audio")]
+        return None if None in bitrates else sum(bitrate or 0 for bitrate in bitrates)
+
+    async def compress(self, input_path: Path, progress: Progress) -> AsyncGenerator[Path]:
+        duration = await self.get_duration(input_path)
+        output_path = self.get_output_path(input_path)
+
+        plan = await self.plan(input_path)
+        progress.report(plan)
+        with atomic_output(output_path) as partial_path:
+            match plan:
+                case Plan.REMUX:
+                    await self.remux(input_path, partial_path, duration, progress)
+                case Plan.COPY_AUDIO:
+                    await self.encode_single_pass(input_path, partial_path, duration, progress, copy_audio=True)
+                case Plan.ENCODE if self.segments > 1 and duration >= 2 * self.min_segment_duration:
+                    await self.encode_segments(input_path, partial_path, duration, progress)
+                case Plan.ENCODE if self.single_pass:
+                    await self.encode_single_pass(input_path, partial_path, duration, progress)
+                case Plan.ENCODE:
+                    await self.encode_two_pass(input_path, partial_path, duration, progress)
+
+        yield output_path
+
+    async def remux(self, input_path: Path, output_path: Path, duration: float, progress: Progress) -> None:
+        input_stream = ffmpeg_input(input_path)
+        has_audio = bool(await self.get_streams(input_path, "audio"))
+        stream = input_stream.video_stream(0).output(
+            *([input_stream.audio] if has_audio else []),
+            filename=output_path,
+            c="copy",
+        )
+        await self.encode_with_progress(stream, duration, progress)
+
+    async def encode_single_pass(self, input_path: Path, output_path: Path, duration: float, progress: Progress, *, copy_audio: bool = False) -> None:
+        audio_streams = await self.get_streams(input_path, "audio")
+        if copy_audio:
+            audio_bitrate = await self.get_audio_bitrate(input_path) or 0
+            audio_options = {"c:a": "copy"}
+        elif audio_streams:
+            audio_bitrate = self.audio_bitrate
+            audio_options = {"b:a": self.audio_bitrate}
+        else:
+            audio_bitrate = 0
+            audio_options = {}
+        video_max_rate = 8 * self.max_size / duration - audio_bitrate
+
+        hwaccel = await self.get_hwaccel()
+        video_encoder = await self.get_video_encoder()
+        for _ in range(self.max_attempts):
+            input_stream = ffmpeg_input(input_path, hwaccel=hwaccel)
+            stream = input_stream.video_stream(0).output(
+                *([input_stream.audio] if audio_streams else []),
+                filename=output_path,
+                vcodec=video_encoder,
+                extra_options={
+                    **audio_options,
+                    **self.rate_options(video_max_rate),
+                },
+            )
+            await self.encode_with_progress(stream, duration, progress)
+
+            if (size := output_path.stat().st_size) <= self.max_size:  # noqa: ASYNC240
+                return
+            video_max_rate *= self.max_size / size
+
+        msg = f"{output_path} is still larger than {self.max_size.human_readable()} after {self.max_attempts} attempts."
+        raise RuntimeError(msg)
+
+    async def encode_segments(self, input_path: Path, output_path: Path, duration: float, progress: Progress) -> None:
+        count = min(self.segments, int(duration // self.min_segment_duration))
+        keyframe_times = await self.get_keyframe_times(input_path, (duration * index / count for index in range(1, count)))
+        times = [0, *(time for time in keyframe_times if 0 < time < duration), duration]
+
+        has_audio = bool(await self.get_streams(input_path, "audio"))
+        audio_bitrate = self.audio_bitrate if has_audio else 0
+        video_bits = 8 * self.max_size - audio_bitrate * duration
+        hwaccel = await self.get_hwaccel()
+        video_encoder = await self.get_video_encoder()
+
+        with TemporaryDirectory() as directory:
+            directory_path = Path(directory)
+            segment_paths = [directory_path / f"{index}{self.output_suffix}" for index in range(len(times) - 1)]
+            audio_path = directory_path / f"audio{self.output_suffix}"
+            list_path = directory_path / "segments.txt"
+            list_path.write_text("".join(f"file '{segment_path.as_posix()}'\n" for segment_path in segment_paths), encoding="utf-8")
+
+            audio_encodes = []
+            if has_audio:
+                stream = ffmpeg_input(input_path).audio.output(filename=audio_path, extra_options={"b:a": audio_bitrate})
+                audio_encodes.append(self.encode_with_progress(stream, duration, PartProgress(progress)))
+
+            for _ in range(self.max_attempts):
+                parts: list[PartProgress] = []
+                segment_encodes = [
+                    self.encode_with_progress(
+                        ffmpeg_input(input_path, ss=start, t=end - start, hwaccel=hwaccel)
+                        .video_stream(0)
+                        .output(
+                            filename=segment_path,
+                            vcodec=video_encoder,
+                            extra_options=self.rate_options(video_bits / duration),
+                        ),
+                        end - start,
+                        PartProgress(progress, parts, end - start),
+                    )
+                    for (start, end), segment_path in zip(pairwise(times), segment_paths, strict=True)
+                ]
+                await self.encode_all([*segment_encodes, *audio_encodes], progress)
+                audio_encodes.clear()
+
+                concat_stream = ffmpeg_input(list_path, f="concat", extra_options={"safe": 0}).video_stream(0)
+                stream = concat_stream.output(
+                    *([ffmpeg_input(audio_path).audio] if has_audio else []),
                     filename=output_path,
-                    acodec="copy",
-                    extra_options={
-                        "bufsize": 2 * video_max_rate,
-                        "maxrate": video_max_rate,
-                    },
+                    c="copy",
                 )
+                await self.encode_with_progress(stream, duration, progress)
+
+                if (size := output_path.stat().st_size) <= self.max_size:  # noqa: ASYNC240
+                    return
+                video_bits *= self.max_size / size
+
+        msg = f"{output_path} is still larger than {self.max_size.human_readable()} after {self.max_attempts} attempts."
+        raise RuntimeError(msg)
+
+    async def encode_two_pass(self, input_path: Path, output_path: Path, duration: float, progress: Progress) -> None:
+        with TemporaryDirectory() as directory:
+            audio_path = Path(directory) / f"audio{self.output_suffix}"
+
+            input_stream = ffmpeg_input(input_path, hwaccel=await self.get_hwaccel())
+            stream = input_stream.audio.output(filename=audio_path)
+            await self.encode_with_progress(stream, duration, progress)
 
-                self.encode_with_progress(stream, duration)
+            video_max_rate = 8 * (self.max_size - audio_path.stat().st_size) / duration
+            stream = input_stream.video_stream(0).output(
+                ffmpeg_input(audio_path),
+                filename=output_path,
+                acodec="copy",
+                vcodec=await self.get_video_encoder(),
+                extra_options=self.rate_options(video_max_rate),
+            )
 
-                yield output_path
+            await self.encode_with_progress(stream, duration, progress)
@@ -1,22 +1,30 @@
+import re
+from contextlib import ExitStack
 from datetime import timedelta
 from functools import partial, total_ordering
-from operator import itemgetter
-from os import fspath
-from pathlib import Path  # noqa: TC003
-from typing import TYPE_CHECKING, Self, override
+from itertools import groupby
+from operator import attrgetter
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, ClassVar, Self, override
 from uuid import UUID, uuid4
 
 from ffmpeg import input as ffmpeg_input
-from ffmpeg_normalize import FFmpegNormalize
-from nicegui import ui
+from ffmpeg import merge_outputs
+from pydantic import BaseModel, field_validator
 from pytimeparse2 import parse
 
-from util_scripts.utils.common import Common, FullyValidatedModel
+from util_scripts.utils.cache import DiskCache, file_key
+from util_scripts.utils.common import Common, FullyValidatedModel, Job, PartProgress, Progress
+from util_scripts.utils.job_queue import atomic_output
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Iterable
+    from collections.abc import AsyncGenerator, Generator
 
-    from nicegui.events import ValueChangeEventArguments
+    from ffmpeg.dag.nodes import OutputStream
+    from ffmpeg.streams.audio import AudioStream
+
+LOUDNORM_PATTERN = re.compile(r"\[Parsed_loudnorm_(\d+) @ [^\]]+\]\s*(?:\[info\]\s*)?(\{.*?\})", re.DOTALL)
 
 
 @total_ordering
@@ -29,85 +37,127 @@ class Reaction(FullyValidatedModel):
         return self.input_path < other.input_path
 
 
+class LoudnessStats(BaseModel):
+    input_i: float
+    input_tp: float
+    input_lra: float
+    input_thresh: float
+    target_offset: float
+
+    @field_validator("*")
+    @classmethod
+    def clamp_infinite(cls, value: float) -> float:
+        return max(-99, min(value, 99))
+
+
 class Discord(Common):
+    loudness_cache: ClassVar = DiskCache(name="loudness", max_size="1MiB")  # pyright: ignore[reportArgumentType]
+    clip_duration: ClassVar = 5
+    target_level: ClassVar = -23
+    true_peak: ClassVar = -2
+    loudness_range: ClassVar = 7
+
+    unfingerprinted_fields: ClassVar = {*Common.unfingerprinted_fields, "reactions"}
+
     reactions: dict[UUID, Reaction] = {}  # noqa: RUF012
     output_suffix: str = ".opus"
 
-    @staticmethod
-    def serialize(paths: Iterable[Path]) -> list[str]:
-        return list(map(fspath, paths))
+    @field_validator("reactions", mode="before")
+    @classmethod
+    def key_reactions(cls, value: object) -> object:
+        if isinstance(value, list):
+            return {uuid4(): reaction for reaction in value}  # pyright: ignore[reportUnknownVariableType]
+        return value
 
     @staticmethod
     def parse_to_float(time: str) -> float | None:
         value = parse(time)
         return value.total_seconds() if isinstance(value, timedelta) else value
 
-    def on_remove_edit(self, uuid: UUID) -> None:
-        del self.reactions[uuid]
-        self.write()  # pyright: ignore[reportCallIssue]
-
-    @ui.refreshable_method
-    def on_selection(self, arguments: ValueChangeEventArguments | None) -> None:
-        if arguments is not None:
-            self.reactions[uuid4()] = Reaction(input_path=arguments.value)
-            self.write()  # pyright: ignore[reportCallIssue]
-
-        for uuid, reaction in sorted(self.reactions.items(), key=itemgetter(1)):
-            with ui.chip(removable=True, on_value_change=partial(self.on_remove_edit, uuid)).classes("h-full").props("outline"), ui.grid(columns=2):
-                ui.label(reaction.input_path.name).classes("col-span-full text-caption text-grey")
-                self.media_element(reaction.input_path)
-                with ui.column():
-                    ui.input("Start Time", on_change=self.write).classes("w-full").props("clearable").bind_value(reaction, "start_time")  # pyright: ignore[reportArgumentType]
-                    ui.input("Output Filename Base", on_change=self.write).classes("w-full").bind_value(reaction, "output_filename_base")  # pyright: ignore[reportArgumentType]
-
     @override
-    def model_post_init(self, context: object) -> None:
-        with ui.row(wrap=False).classes("w-full"):
-            self._input_selector = ui.select(
-                self.serialize(self.input_paths),
-                label="Select Input",
-                on_change=lambda arguments: self.on_selection.refresh(arguments),
-            ).classes("w-full")
-            ui.input("Output Suffix").bind_value(self, "output_suffix")
-
-        with ui.expansion("Edits").classes("w-full"), ui.grid(columns=3):
-            self.on_selection(None)
-
-        super().model_post_init(context)
-
-    @override
-    async def select_inputs(self) -> None:
-        await super().select_inputs()
-        self._input_selector.set_options(self.serialize(self.input_paths))  # pyright: ignore[reportUnknownMemberType]
+    def jobs(self) -> Generator[Job]:
+        manifest = self.read_manifest()
+        for input_path, group in groupby(sorted(self.reactions.values()), attrgetter("input_path")):
+            reactions = list(group)
+            outputs = {self.get_reaction_output_path(reaction): self.fingerprint(input_path, reaction.model_dump(mode="json")) for reaction in reactions}
+            current = [output_path for output_path, fingerprint in outputs.items() if self.is_current(manifest, output_path, fingerprint)]
+            stale = [reaction for reaction in reactions if self.get_reaction_output_path(reaction) not in current]
+            yield Job(input_path.name, partial(self.cut, input_path, stale, current), outputs)
+
+    def get_reaction_output_path(self, reaction: Reaction) -> Path:
+        return (self.output_directory / reaction.output_filename_base).with_suffix(self.output_suffix)
+
+    async def cut(self, input_path: Path, reactions: list[Reaction], current: list[Path], progress: Progress) -> AsyncGenerator[Path]:
+        for output_path in current:
+            yield output_path
 
-    @override
-    def main(self) -> Generator[Path]:
-        for reaction in self.reactions.values():
-            output_path = (self.output_directory / reaction.output_filename_base).with_suffix(self.output_suffix)
+        output_paths = list(map(self.get_reaction_output_path, reactions))
+        for output_path in output_paths:
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            duration = 5
-            stream = (
-                ffmpeg_input(
-                    reaction.input_path,
-                    ss=self.parse_to_float(reaction.start_time),
-                )
-                .silenceremove(
-                    start_periods=1,
-                    stop_periods=1,
-                )
-                .output(
-                    filename=output_path,
-                    t=duration,
-                    ac=2,
+        start_times = [self.parse_to_float(reaction.start_time) or 0 for reaction in reactions]
+        keys = [(*file_key(input_path), start_time, self.clip_duration, self.target_level, self.true_peak, self.loudness_range) for start_time in start_times]
+
+        with TemporaryDirectory() as directory, ExitStack() as stack:
+            partial_paths = [stack.enter_context(atomic_output(output_path)) for output_path in output_paths]
+            outputs: list[OutputStream] = []
+            clip_paths: dict[tuple[object, ...], Path] = {}
+            unmeasured: list[tuple[tuple[object, ...], Path]] = []
+            for key, start_time, partial_path in zip(keys, start_times, partial_paths, strict=True):
+                clip = (
+                    ffmpeg_input(input_path, ss=start_time)
+                    .audio.silenceremove(
+                        start_periods=1,
+                        stop_periods=1,
+                    )
+                    .atrim(duration=self.clip_duration)
                 )
+                if (cached := self.loudness_cache.read_text(*key)) is not None:
+                    outputs.append(self.normalize(clip, LoudnessStats.model_validate_json(cached)).output(filename=partial_path, ac=2, ar=48_000))
+                else:
+                    unmeasured.append((key, partial_path))
+                    if key not in clip_paths:
+                        clip_paths[key] = clip_path = Path(directory) / f"{len(clip_paths)}.wav"
+                        outputs.append(clip.output(filename=clip_path, ac=2))
+                        outputs.append(self.measure(clip).output(filename="-", f="null"))
+
+            errors = await self.encode_with_progress(
+                merge_outputs(*outputs),
+                self.clip_duration,
+                progress,
+                loglevel="info",
             )
 
-            seconds = self.parse_to_float(reaction.start_time) or 0
-            self.encode_with_progress(stream, min(5, self.get_duration(reaction.input_path) - seconds))
+            matches = sorted(LOUDNORM_PATTERN.finditer(errors), key=lambda match: int(match[1]))
+            stats = {key: LoudnessStats.model_validate_json(match[2]) for key, match in zip(clip_paths, matches, strict=True)}
+            for key, key_stats in stats.items():
+                self.loudness_cache.write_text(key_stats.model_dump_json(), *key)
 
-            normalize = FFmpegNormalize(audio_codec="libopus", extension=self.output_suffix)
-            normalize.add_media_file(fspath(output_path), fspath(output_path))
-            normalize.run_normalization()
+            parts: list[PartProgress] = []
+            applies = []
+            for key, partial_path in unmeasured:
+                applies.append(self.apply_loudness(clip_paths[key], partial_path, stats[key], PartProgress(progress, parts, self.clip_duration)))
+            await self.encode_all(applies, progress)
 
+        for output_path in output_paths:
             yield output_path
+
+    def measure(self, clip: AudioStream) -> AudioStream:
+        return clip.loudnorm(I=self.target_level, TP=self.true_peak, LRA=self.loudness_range, print_format="json")
+
+    def normalize(self, clip: AudioStream, stats: LoudnessStats) -> AudioStream:
+        return clip.loudnorm(
+            I=self.target_level,
+            TP=self.true_peak,
+            LRA=self.loudness_range,
+            measured_I=stats.input_i,
+            measured_TP=stats.input_tp,
+            measured_LRA=stats.input_lra,
+            measured_thresh=stats.input_thresh,
+            offset=stats.target_offset,
+            linear=True,
+        )
+
+    async def apply_loudness(self, clip_path: Path, output_path: Path, stats: LoudnessStats, progress: Progress) -> None:
+        stream = self.normalize(ffmpeg_input(clip_path).audio, stats).output(filename=output_path, ar=48_000)
+        await self.encode_with_progress(stream, self.clip_duration, progress)
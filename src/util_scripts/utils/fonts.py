@@ -0,0 +1,63 @@
+from functools import lru_cache
+from os import environ, pathsep, walk
+from pathlib import Path
+from threading import Lock
+from typing import ClassVar, Self
+
+from fontra import all_fonts, get_font, get_font_styles, get_fontdirs, get_localized_names, init_fontdb, update_system_fontdirs
+from pydantic import BaseModel
+
+from util_scripts.utils.cache import DiskCache
+
+FONT_INDEX_LOCK = Lock()
+
+
+def font_directories_key() -> tuple[object, ...]:
+    update_system_fontdirs()
+    custom_directories = environ.get("PYFONTRA_CUSTOM_FONTDIRS", "")
+    directories = [*get_fontdirs(), *(Path(directory).expanduser() for directory in custom_directories.split(pathsep) if directory)]
+    return custom_directories, tuple(sorted((root, Path(root).stat().st_mtime_ns) for directory in directories for root, _, _ in walk(directory)))
+
+
+class FontIndex(BaseModel):
+    cache: ClassVar = DiskCache(name="fonts", max_size="16MiB")  # pyright: ignore[reportArgumentType]
+
+    families: dict[str, dict[str, Path]] = {}
+    aliases: dict[str, str] = {}
+
+    @classmethod
+    def build(cls) -> Self:
+        init_fontdb()
+        families = {family: {style: get_font(family, style, localized=False).path for style in get_font_styles(family, localized=False)} for family in sorted(all_fonts())}
+        aliases = {alias: family for family in families for alias in get_localized_names(family) if alias != family}
+        return cls(families=families, aliases=aliases)
+
+    def get_font_styles(self, family: str) -> dict[str, Path]:
+        if (styles := self.families.get(self.aliases.get(family, family))) is None:
+            msg = f"Font {family!r} not found."
+            raise KeyError(msg)
+        return styles
+
+    def has_font_style(self, family: str, style: str) -> bool:
+        return style in self.families.get(self.aliases.get(family, family), {})
+
+    def get_font(self, family: str, style: str) -> Path:
+        if (path := self.get_font_styles(family).get(style)) is None:
+            msg = f"Font style {style!r} of font {family!r} not found."
+            raise KeyError(msg)
+        return path
+
+
+@lru_cache(maxsize=1)
+def read_font_index(key: tuple[object, ...]) -> FontIndex:
+    if (cached := FontIndex.cache.read_text(key)) is not None:
+        return FontIndex.model_validate_json(cached)
+
+    font_index = FontIndex.build()
+    FontIndex.cache.write_text(font_index.model_dump_json(), key)
+    return font_index
+
+
+def load_font_index() -> FontIndex:
+    with FONT_INDEX_LOCK:
+        return read_font_index(font_directories_key())
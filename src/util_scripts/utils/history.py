@@ -0,0 +1,76 @@
+import os
+import sqlite3
+from contextlib import closing
+from csv import DictWriter
+from datetime import datetime  # noqa: TC003
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+DATA_DIRECTORY = Path(os.environ.get("XDG_DATA_HOME", Path.home() / ".local" / "share")) / "util-scripts"
+
+
+class Usage(NamedTuple):
+    cpu_time: float
+    peak_rss: int
+
+
+def read_usage(pid: int) -> Usage | None:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+        status = Path(f"/proc/{pid}/status").read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+    utime, stime = stat.rpartition(")")[2].split()[11:13]
+    if (peak_rss := next((int(line.split()[1]) * 1024 for line in status.splitlines() if line.startswith("VmHWM:")), None)) is None:
+        return None
+    return Usage((int(utime) + int(stime)) / os.sysconf("SC_CLK_TCK"), peak_rss)
+
+
+class EncodeRecord(BaseModel):
+    started_at: datetime
+    tool: str
+    job: str
+    state: str
+    wall_time: float
+    cpu_time: float | None
+    peak_rss: int | None
+    fps: float | None
+    speed: float | None
+    input_bytes: int
+    output_bytes: int | None
+    command_line: str
+
+
+class History:
+    path: ClassVar = DATA_DIRECTORY / "history.sqlite3"
+    columns: ClassVar = tuple(EncodeRecord.model_fields)
+
+    @classmethod
+    def connect(cls) -> sqlite3.Connection:
+        cls.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(cls.path)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS encodes ({', '.join(cls.columns)})")
+        return connection
+
+    @classmethod
+    def add(cls, record: EncodeRecord) -> None:
+        with closing(cls.connect()) as connection, connection:
+            connection.execute(f"INSERT INTO encodes VALUES ({', '.join('?' * len(cls.columns))})", tuple(record.model_dump(mode="json").values()))  # noqa: S608
+
+    @classmethod
+    def read(cls, limit: int = -1) -> list[EncodeRecord]:
+        with closing(cls.connect()) as connection:
+            rows = connection.execute("SELECT * FROM encodes ORDER BY started_at DESC LIMIT ?", (limit,)).fetchall()
+        return [EncodeRecord.model_validate(dict(zip(cls.columns, row, strict=True))) for row in rows]
+
+    @classmethod
+    def export_csv(cls, fp: TextIO) -> None:
+        writer = DictWriter(fp, cls.columns)
+        writer.writeheader()
+        writer.writerows(record.model_dump(mode="json") for record in cls.read())
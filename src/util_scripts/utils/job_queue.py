@@ -0,0 +1,68 @@
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import UTC, datetime
+from enum import StrEnum
+from typing import TYPE_CHECKING, ClassVar
+
+from util_scripts.utils.history import DATA_DIRECTORY
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from pathlib import Path
+
+
+class JobState(StrEnum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@contextmanager
+def atomic_output(output_path: Path) -> Generator[Path]:
+    partial_path = output_path.with_name(f".{output_path.stem}.partial{output_path.suffix}")
+    try:
+        yield partial_path
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    partial_path.replace(output_path)
+
+
+class JobQueue:
+    path: ClassVar = DATA_DIRECTORY / "queue.sqlite3"
+
+    @classmethod
+    def connect(cls) -> sqlite3.Connection:
+        cls.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(cls.path)
+        connection.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, tool, settings, created_at)")
+        connection.execute("CREATE TABLE IF NOT EXISTS jobs (run_id, position, name, state, PRIMARY KEY (run_id, position))")
+        return connection
+
+    @classmethod
+    def create_run(cls, tool: str, settings: str, names: Iterable[str]) -> int:
+        with closing(cls.connect()) as connection, connection:
+            run_id = connection.execute("INSERT INTO runs (tool, settings, created_at) VALUES (?, ?, ?)", (tool, settings, datetime.now(UTC).isoformat())).lastrowid
+            connection.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?)", ((run_id, position, name, JobState.PENDING) for position, name in enumerate(names)))
+        if run_id is None:
+            msg = "SQLite did not return the id of the new run."
+            raise RuntimeError(msg)
+        return run_id
+
+    @classmethod
+    def set_state(cls, run_id: int, position: int, state: JobState) -> None:
+        with closing(cls.connect()) as connection, connection:
+            connection.execute("UPDATE jobs SET state = ? WHERE run_id = ? AND position = ?", (state, run_id, position))
+
+    @classmethod
+    def pending(cls, run_id: int) -> set[int]:
+        with closing(cls.connect()) as connection:
+            return {position for (position,) in connection.execute("SELECT position FROM jobs WHERE run_id = ? AND state = ?", (run_id, JobState.PENDING))}
+
+    @classmethod
+    def latest_unfinished(cls, tool: str) -> tuple[int, str] | None:
+        with closing(cls.connect()) as connection:
+            if (run := connection.execute("SELECT id, settings FROM runs WHERE tool = ? ORDER BY id DESC LIMIT 1", (tool,)).fetchone()) is None:
+                return None
+            pending = connection.execute("SELECT 1 FROM jobs WHERE run_id = ? AND state = ? LIMIT 1", (run[0], JobState.PENDING)).fetchone()
+        return run if pending else None
@@ -1,23 +1,25 @@
+from asyncio import to_thread
 from functools import partial
-from typing import TYPE_CHECKING, ClassVar, TypeVar, override
+from typing import TYPE_CHECKING, ClassVar, override
 
 from ffmpeg import input as ffmpeg_input
-from fontra import all_fonts, get_font, get_font_styles, has_font_style, init_fontdb
-from nicegui import element, ui
+from ffmpeg.sources import color
 from pydantic import PositiveFloat, PositiveInt  # noqa: TC002
 from pydantic_extra_types.color import Color
 
-from util_scripts.utils.common import Common
+from util_scripts.utils.cache import DiskCache
+from util_scripts.utils.common import Common, Job, Progress
+from util_scripts.utils.fonts import load_font_index
+from util_scripts.utils.job_queue import atomic_output
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import AsyncGenerator, Generator
     from pathlib import Path
 
-AnyElement = TypeVar("AnyElement", bound=element)
-
 
 class Meme(Common):
     default_font_style: ClassVar = "Regular"
+    caption_cache: ClassVar = DiskCache(name="captions", max_size="64MiB")  # pyright: ignore[reportArgumentType]
 
     text: str = ""
     font_family: str = "Impact"
@@ -30,82 +32,60 @@ class Meme(Common):
     output_suffix: str = ".webp"
 
     @override
-    def model_post_init(self, context: object) -> None:
-        init_fontdb()
-
-        with ui.row(wrap=False, align_items="center"):
-            self.set_font_family(self.font_family)
-            self.color_picker_button("Font Color", "font_color")
-            self.color_picker_button("Box Color", "box_color")
-            ui.checkbox("Loop").bind_value(self, "loop")
-
-        with ui.row(wrap=False, align_items="center").classes("w-full"):
-            ui.label("Font Size").classes("text-caption text-grey")
-            ui.slider(min=1, max=200).props("label-always").bind_value(self, "font_size")
-            ui.separator().props("vertical")
-            ui.label("Box Height").classes("text-caption text-grey")
-            ui.slider(min=1, max=500).props("label-always").bind_value(self, "box_height")
-
-        self._text_area = ui.textarea("Overlay Text").classes("w-full").props("clearable").bind_value(self, "text")
-
-        return super().model_post_init(context)
-
-    @ui.refreshable_method
-    def set_font_family(self, font_family: str) -> None:
-        self.font_family = font_family
-
-        with ui.dropdown_button(self.font_family, auto_close=True).style(f"font-family: {self.font_family}"), ui.column(align_items="stretch").classes("gap-0"):
-            for family in sorted(all_fonts()):
-                ui.item(
-                    family,
-                    on_click=partial(self.set_font_family.refresh, family),
-                ).style(f"font-family: {family}").set_enabled(self.font_family != family)
-
-    def color_picker_button(self, text: str, attr: str) -> None:
-        with ui.button(text, icon="palette") as color_button:
-            ui.color_picker(on_pick=lambda e: self.on_pick_color(color_button, Color(e.color), attr))
-        self.on_pick_color(color_button, getattr(self, attr), attr)
-
-    def on_pick_color(self, button: ui.element, background_color: Color, attr: str) -> None:
-        r, g, b = (255 - int(value) for value in background_color.as_rgb_tuple())
-        text_color = Color((r, g, b))
-
-        button.classes(f"!text-[{text_color.as_hex(format='long')}]")
-        button.classes(f"!bg-[{background_color.as_hex(format='long')}]")
-        setattr(self, attr, background_color)
-
-    @override
-    def main(self) -> Generator[Path]:
-        font_style = get_font_styles(self.font_family)[0] if not has_font_style(self.font_family, self.default_font_style) else self.default_font_style
-        font_file = str(get_font(self.font_family, font_style).path)
+    def jobs(self) -> Generator[Job]:
+        font_index = load_font_index()
+        font_style = next(iter(font_index.get_font_styles(self.font_family))) if not font_index.has_font_style(self.font_family, self.default_font_style) else self.default_font_style
+        font_file = str(font_index.get_font(self.font_family, font_style))
 
         for input_path in self.input_paths:
-            info = self.get_ffprobe_info(input_path, "stream", "width", stream="v")
-            if info.streams is None or info.streams.stream is None or info.streams.stream[0].width is None:
-                msg = f"The value of 'stream' or 'width' is None: {info}"
-                raise ValueError(msg)
+            yield Job(input_path.name, partial(self.caption, input_path, font_file), {self.get_output_path(input_path): self.fingerprint(input_path, font_file)})
 
-            output_path = self.get_output_path(input_path)
+    async def caption(self, input_path: Path, font_file: str, progress: Progress) -> AsyncGenerator[Path]:
+        output_path = self.get_output_path(input_path)
+        caption_path = await self.render_caption(font_file, await self.get_width(input_path))
+        with atomic_output(output_path) as partial_path:
             stream = (
-                ffmpeg_input(input_path, hwaccel=self.hwaccel)
-                .drawtext(
-                    fontfile=font_file,
-                    text=self.text.replace("\n", "\r"),
-                    box=True,
-                    boxcolor=self.box_color.as_hex(format="long"),
-                    fontcolor=self.font_color.as_hex(format="long"),
-                    fontsize=self.font_size,
-                    text_align="center+middle",
-                    boxw=info.streams.stream[0].width,
-                    boxh=self.box_height,
-                )
+                ffmpeg_input(input_path, hwaccel=await self.get_hwaccel())
+                .overlay(ffmpeg_input(caption_path).video)
                 .output(
-                    filename=output_path,
+                    filename=partial_path,
+                    vcodec=await self.get_video_encoder(),
                     extra_options={
                         "loop": int(not self.loop),
                     },
                 )
             )
 
-            self.encode_with_progress(stream, self.get_duration(input_path))
-            yield output_path
+            await self.encode_with_progress(stream, await self.get_duration(input_path), progress)
+        yield output_path
+
+    async def render_caption(self, font_file: str, width: int) -> Path:
+        box_color = self.box_color.as_hex(format="long")
+        font_color = self.font_color.as_hex(format="long")
+        key = (self.text, font_file, self.font_size, self.box_height, box_color, font_color, width)
+        if (caption_path := self.caption_cache.get(*key, suffix=".png")) is not None:
+            return caption_path
+
+        stream = (
+            color(color="black@0", size=f"{width}x{self.box_height}")
+            .format(pix_fmts="rgba")
+            .drawtext(
+                fontfile=font_file,
+                text=self.text.replace("\n", "\r"),
+                box=True,
+                boxcolor=box_color,
+                fontcolor=font_color,
+                fontsize=self.font_size,
+                text_align="center+middle",
+                boxw=width,
+                boxh=self.box_height,
+            )
+            .output(
+                filename="-",
+                f="image2pipe",
+                vcodec="png",
+                extra_options={"frames:v": 1},
+            )
+        )
+        data, _ = await to_thread(stream.run, capture_stdout=True, quiet=True)
+        return self.caption_cache.write_bytes(data, *key, suffix=".png")
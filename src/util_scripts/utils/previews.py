@@ -0,0 +1,46 @@
+from asyncio import Semaphore, to_thread
+from typing import TYPE_CHECKING
+
+from ffmpeg import input as ffmpeg_input
+from ffmpeg.exceptions import FFMpegExecuteError
+
+from util_scripts.utils.cache import DiskCache, file_key
+from util_scripts.utils.common import default_workers
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+PREVIEW_CACHE = DiskCache(name="previews", max_size="256MiB")  # pyright: ignore[reportArgumentType]
+PREVIEW_WIDTH = 320
+PREVIEW_WORKERS = Semaphore(default_workers())
+
+
+async def get_preview(path: Path) -> Path | None:
+    try:
+        key = (*file_key(path), PREVIEW_WIDTH)
+    except FileNotFoundError:
+        return None
+    if (preview_path := PREVIEW_CACHE.get(*key, suffix=".webp")) is not None:
+        return preview_path
+    if PREVIEW_CACHE.get(*key, suffix=".failed") is not None:
+        return None
+
+    stream = (
+        ffmpeg_input(path)
+        .video.scale(w=f"min({PREVIEW_WIDTH},iw)", h=-2)
+        .output(
+            filename="-",
+            f="image2pipe",
+            vcodec="libwebp",
+            extra_options={"frames:v": 1},
+        )
+    )
+    async with PREVIEW_WORKERS:
+        try:
+            data, _ = await to_thread(stream.run, capture_stdout=True, quiet=True)
+        except FFMpegExecuteError:
+            data = b""
+    if not data:
+        PREVIEW_CACHE.write_bytes(data, *key, suffix=".failed")
+        return None
+    return PREVIEW_CACHE.write_bytes(data, *key, suffix=".webp")